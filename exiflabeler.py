@@ -23,15 +23,27 @@ import os
 import os.path
 import argparse
 import atexit
-
-from collections import namedtuple
+import bisect
+import contextlib
+import errno
+import importlib.util
+import io
+import json
+import sys
+import threading
+import traceback
+
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
 import functools
 import re
-from csv import reader as CsvReader
 from datetime import datetime, timezone, timedelta
-import pytz
+from zoneinfo import ZoneInfo
 
-print = functools.partial(print, flush=True)
+# flush output per line (also when redirected), without forcing a flush on every print() call
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(line_buffering=True)
 
 # Note: most of the time, should only use if interactive=True
 def input_prefill(prompt, prefill=''):
@@ -42,23 +54,44 @@ def input_prefill(prompt, prefill=''):
     finally:
         readline.set_startup_hook()
 
-# WARNING: should always use get_timezone('UTC') instead of timezone.utc for compatibility with pytz timezones
+_UTC = timezone.utc
+
+# offset_str: ISO-8601 offset, e.g. "+0800", "-08:00", "+08"
+def _parse_utc_offset_minutes(offset_str):
+    digits = offset_str[1:].replace(':', '')
+    if (offset_str[0] not in '+-' or not digits.isdigit() or len(digits) not in (2, 4)
+        or int(digits[0:2]) >= 24 or int(digits[2:4] or 0) >= 60
+    ):
+        raise ValueError('Invalid UTC offset: %s' %offset_str)
+    minutes = int(digits[0:2]) * 60 + int(digits[2:4] or 0)
+    return -minutes if offset_str[0] == '-' else minutes
+
+# one shared instance per distinct offset, regardless of how the offset was spelled (e.g. "UTC+08:00", "GMT+0800")
+@functools.lru_cache(maxsize=None)
+def _fixed_offset_timezone(offset_minutes):
+    hours, minutes = divmod(abs(offset_minutes), 60)
+    name = 'UTC%s%02d%02d' %('-' if offset_minutes < 0 else '+', hours, minutes)
+    return timezone(timedelta(minutes=offset_minutes), name)
+
+# cached so that each tz string resolves to a single shared tzinfo object
+@functools.lru_cache(maxsize=None)
 def get_timezone(tzname):
+    if tzname == 'UTC':
+        return _UTC
     FIXED_OFFSET_PREFIXES = ['UTC', 'GMT']
     for p in FIXED_OFFSET_PREFIXES:
         if not tzname.startswith(p):
             continue
         offset_str = tzname[len(p):]
-        # pytz.FixedOffset only supports whole-minute offsets # TODO dateutil migration
-        if not offset_str:
-            offset_minutes = 0
-        else:
-            offset_minutes = datetime.strptime(offset_str, '%z').utcoffset().total_seconds() / 60
-        tz = pytz.FixedOffset(offset_minutes)
-        #tz.zone = 'UTC{0:+}'.format(offset_hours)
-        tz.zone = 'UTC' + offset_str
-        return tz
-    return pytz.timezone(tzname)
+        offset_minutes = _parse_utc_offset_minutes(offset_str) if offset_str else 0
+        if not offset_minutes:
+            return _UTC
+        return _fixed_offset_timezone(offset_minutes)
+    return ZoneInfo(tzname)
+
+# returns: name of timezone as specified to get_timezone()
+def get_timezone_name(tz):
+    return getattr(tz, 'key', None) or tz.tzname(None) # ZoneInfo or fixed-offset timezone
 
 #
 # image & exif
@@ -66,7 +99,23 @@ def get_timezone(tzname):
 
 EXIF_TIMESTAMP_FORMAT = '%Y:%m:%d %H:%M:%S'
 
+# indentation prefixes for printing, indexed by indent level
+_INDENT = ['\t' * i for i in range(8)]
+
+# fast path for EXIF_TIMESTAMP_FORMAT, which is fixed-width (strptime is comparatively slow)
+# returns None if localtime_str does not have the expected layout
+def _parse_exif_timestamp(s):
+    if len(s) != 19 or s[4] != ':' or s[7] != ':' or s[10] != ' ' or s[13] != ':' or s[16] != ':':
+        return None
+    try:
+        return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), int(s[17:19]))
+    except ValueError:
+        return None
+
 def parse_timestamp(localtime_str):
+    localtime = _parse_exif_timestamp(localtime_str)
+    if localtime is not None:
+        return localtime
     try:
         localtime = datetime.strptime(localtime_str, EXIF_TIMESTAMP_FORMAT)
     except:
@@ -75,14 +124,25 @@ def parse_timestamp(localtime_str):
         raise
     return localtime
 
+# whether localtime (naive) maps to more than one point in time under tz, e.g. during a backward DST transition
+# i.e. both folds are valid (converting back from UTC yields the same localtime) and have different offsets
+def is_ambiguous_localtime(tz, localtime):
+    dt = localtime.replace(tzinfo=tz, fold=1)
+    return (dt.utcoffset() != dt.replace(fold=0).utcoffset()
+        and dt.astimezone(_UTC).astimezone(tz).replace(tzinfo=None) == localtime)
+
+# localtime (naive) -> aware datetime
+# is_dst: selects between the two interpretations of an ambiguous localtime (None: unambiguous)
+# (the earlier interpretation (fold=0) of a backward transition is the one before the clocks are turned back, i.e. DST)
+def localize(tz, localtime, is_dst):
+    return localtime.replace(tzinfo=tz, fold=0 if is_dst or is_dst is None else 1)
+
 # dt must be timezone-aware object
 def print_timestamp(dt, *, heading, indent_level):
     # is_dst (None represents "unambiguous") needed to distinguish "no ambiguity" from "would have been ambiguous but 'no dst' was selected"
     is_dst = None
-    try:
-        dt.tzinfo.localize(dt.replace(tzinfo=None), is_dst=None)
-    except pytz.exceptions.AmbiguousTimeError:
-        is_dst = bool(dt.dst()) # warning: pytz does not support fold() # TODO - phase out pytz later?
+    if is_ambiguous_localtime(dt.tzinfo, dt.replace(tzinfo=None)):
+        is_dst = bool(dt.dst())
     # new_dt isn't technically localtime since it still includes timezone info, but it can be used as localtime
     return print_timestamp_explicit(dt, dt.tzinfo, is_dst,
         heading=heading, indent_level=indent_level)
@@ -93,32 +153,37 @@ def print_timestamp_in(dt, tz, *, heading, indent_level):
         heading=heading, indent_level=indent_level)
 
 def print_timestamp_explicit(localtime, tz, is_dst, *, heading, indent_level):
-    is_dst_str = '' if is_dst is None else ' (DST=%s)' %is_dst
-    print('\t' * indent_level + heading + localtime.strftime(EXIF_TIMESTAMP_FORMAT) + is_dst_str)
+    is_dst_str = '' if is_dst is None else f' (DST={is_dst})'
+    print(f'{_INDENT[indent_level]}{heading}{localtime:{EXIF_TIMESTAMP_FORMAT}}{is_dst_str}')
 
 #class ImageInfo:
 #    pass
 
 class ImageInfo_pillow:
     _name = 'Pillow (PIL fork)'
-    try:
-        import PIL.Image
-        import PIL.ExifTags
-        PIL_EXIF_TAGNAME_MAP = { v: k for k, v in PIL.ExifTags.TAGS.items() }
-        PIL_GPS_TAGNAME_MAP = { v: k for k, v in PIL.ExifTags.GPSTAGS.items() }
-        _supported = True
-        print('[Installed: %s]' %_name)
-    except ModuleNotFoundError:
-        _supported = False
+    # module is only imported on first use (see _load), so that unused backends don't add to startup time
+    _supported = importlib.util.find_spec('PIL') is not None
+    PIL = None
+
+    def _load():
+        if ImageInfo_pillow.PIL is None:
+            import PIL.Image
+            import PIL.ExifTags
+            ImageInfo_pillow.PIL_EXIF_TAGNAME_MAP = { v: k for k, v in PIL.ExifTags.TAGS.items() }
+            ImageInfo_pillow.PIL_GPS_TAGNAME_MAP = { v: k for k, v in PIL.ExifTags.GPSTAGS.items() }
+            ImageInfo_pillow.PIL_EXIF_TAG_MAKERNOTE = ImageInfo_pillow.PIL_EXIF_TAGNAME_MAP['MakerNote']
+            ImageInfo_pillow.PIL = PIL
 
     def __init__(self, path):
         self.path = path
         self.img = None
+        self._exif_dict = None
+        ImageInfo_pillow._load()
 
     # lifecycle
     # refer to https://pillow.readthedocs.io/en/stable/reference/open_files.html#image-lifecycle
     def __enter__(self):
-        self.img = self.PIL.Image.open(path)
+        self.img = self.PIL.Image.open(self.path)
         return self
 
     def __exit__(self, *_):
@@ -127,9 +192,16 @@ class ImageInfo_pillow:
     # TODO depr - exif only or all data? note that this is a lot more limited than exiftool's "full dump"
     def _info(self): return self._exifinfo()
 
+    # reads metadata ahead of use (see preload_image_info)
+    def preload(self):
+        with self:
+            self._exifinfo()
+
     def _exifinfo(self):
-        # internally cached by PIL
-        return self.img._getexif()
+        # PIL's own cache is per Image object and still re-enters PIL code on each call
+        if self._exif_dict is None:
+            self._exif_dict = self.img._getexif() or {} # None if image has no EXIF data
+        return self._exif_dict
 
     def dimensions(self):
         return self.img.size
@@ -156,7 +228,28 @@ class ImageInfo_pillow:
 
 # shared by all exiftool-based implementations
 class ImageInfo_exiftool:
-    def _get_tag(key, func): raise NotImplementedError()
+    # returns: full metadata dict (keys are group-prefixed, e.g. "EXIF:Model"), cached per instance
+    def _info(self): raise NotImplementedError()
+
+    # returns: metadata dict containing (at least) the tags read through get_tag(), cached per instance
+    def _tag_info(self): return self._info()
+
+    # reads metadata ahead of use (see preload_image_info)
+    def preload(self):
+        self._tag_info()
+
+    # all tags are looked up in the cached metadata dict, so each file only costs one exiftool round-trip
+    def _get_tag(self, key):
+        info = self._tag_info() or {}
+        if key in info:
+            return info[key]
+        if ':' not in key:
+            # no group specified - use first matching tag from any group (same as exiftool's own lookup)
+            suffix = ':' + key
+            for info_key, val in info.items():
+                if info_key.endswith(suffix):
+                    return val
+        return None
 
     def dimensions(self):
         return (
@@ -187,27 +280,78 @@ class ImageInfo_exiftool:
 
 class ImageInfo_pyexiftool(ImageInfo_exiftool):
     _name = 'pyexiftool'
-    try:
-        import exiftool
-        # globally-shared instance
-        _tool = exiftool.ExifTool()
-        _supported = True
-        print('[Installed: %s]' %_name)
-    except ModuleNotFoundError:
-        _supported = False
-
+    # module is only imported on first use (see _tool_init)
+    _supported = importlib.util.find_spec('exiftool') is not None
+    # globally-shared instance, created on first use (i.e. not at all if all metadata has been prefetched)
+    _tool = None
     _tool_inited = False
+    # guards creation of the shared instance, and requests to it (the exiftool pipe can only serve one request at a time)
+    _tool_lock = threading.Lock()
+
     def _tool_init():
         # once started, exiftool will remain in the background until the main program terminates.
-        if not ImageInfo_pyexiftool._tool_inited:
-            ImageInfo_pyexiftool._tool_inited = True
-            atexit.register(ImageInfo_pyexiftool._tool.terminate)
-            ImageInfo_pyexiftool._tool.start()
+        if ImageInfo_pyexiftool._tool_inited:
+            return
+        with ImageInfo_pyexiftool._tool_lock:
+            if not ImageInfo_pyexiftool._tool_inited:
+                import exiftool
+                ImageInfo_pyexiftool._tool = exiftool.ExifTool()
+                ImageInfo_pyexiftool._tool.start()
+                atexit.register(ImageInfo_pyexiftool._tool.terminate)
+                # only set once the instance is usable, since this is checked without holding the lock
+                ImageInfo_pyexiftool._tool_inited = True
+
+    def _tool_detach():
+        # for forked worker processes: the inherited exiftool instance belongs to the parent, so start a separate one on demand
+        # (the lock is also replaced, as it may have been held by another thread at the time of the fork)
+        ImageInfo_pyexiftool._tool_lock = threading.Lock()
+        ImageInfo_pyexiftool._tool = None
+        ImageInfo_pyexiftool._tool_inited = False
+
+    # tags read through get_tag() - fetching only these keeps exiftool's output small
+    # (full metadata, which may include large binary tags, is only fetched for print_exif)
+    TAGS_OF_INTEREST = [
+        '-DateTimeOriginal', '-SubSecTimeOriginal',
+        '-Make', '-Model',
+        '-ImageWidth', '-ImageHeight',
+        '-GPS:all',
+    ]
+
+    # returns: [ metadata dict (TAGS_OF_INTEREST only) ] (one per path)
+    def _query_tags(paths):
+        # -fast: don't scan for trailers past the end of the image (e.g. JPEG trailers)
+        # (not -fast2, which stops at the mdat atom of QuickTime-based formats such as HEIC, and may miss metadata there)
+        ImageInfo_pyexiftool._tool_init()
+        with ImageInfo_pyexiftool._tool_lock:
+            return ImageInfo_pyexiftool._tool.execute_json('-fast', *ImageInfo_pyexiftool.TAGS_OF_INTEREST, *paths)
+
+    # metadata fetched ahead of time by prefetch_all(), keyed by path
+    _prefetched = {}
+    _prefetched_full = False
+    def prefetch_all(paths, *, full=False):
+        # fetch metadata for all files using a single exiftool command
+        # full: fetch all tags instead of TAGS_OF_INTEREST
+        if not paths:
+            return
+        ImageInfo_pyexiftool._tool_init()
+        try:
+            if full:
+                with ImageInfo_pyexiftool._tool_lock:
+                    results = ImageInfo_pyexiftool._tool.get_metadata_batch(paths)
+            else:
+                results = ImageInfo_pyexiftool._query_tags(paths)
+        except Exception:
+            # e.g. no output at all, if none of the paths exist - files are then read individually
+            return
+        for info in results:
+            ImageInfo_pyexiftool._prefetched[info['SourceFile']] = info
+        ImageInfo_pyexiftool._prefetched_full = full
 
     def __init__(self, path):
         self.path = path
-        self._cached = None
-        ImageInfo_pyexiftool._tool_init()
+        prefetched = ImageInfo_pyexiftool._prefetched.get(path)
+        self._cached = prefetched if ImageInfo_pyexiftool._prefetched_full else None
+        self._cached_tags = prefetched
 
     def __enter__(self):
         return self
@@ -217,24 +361,47 @@ class ImageInfo_pyexiftool(ImageInfo_exiftool):
 
     def _info(self):
         if self._cached is None:
-            self._cached = self._tool.get_metadata(self.path)
+            ImageInfo_pyexiftool._tool_init()
+            with ImageInfo_pyexiftool._tool_lock:
+                self._cached = ImageInfo_pyexiftool._tool.get_metadata(self.path)
         return self._cached
 
-    def _get_tag(self, key):
-        return ImageInfo_pyexiftool._tool.get_tag(key, self.path)
+    def _tag_info(self):
+        if self._cached is not None:
+            return self._cached
+        if self._cached_tags is None:
+            self._cached_tags = ImageInfo_pyexiftool._query_tags([self.path])[0]
+        return self._cached_tags
 
 class ImageInfo_pyexifinfo(ImageInfo_exiftool):
     _name = 'pyexifinfo'
-    try:
-        import pyexifinfo
-        _supported = True
-        print('[Installed: %s]' %_name)
-    except ModuleNotFoundError:
-        _supported = False
+    # module is only imported on first use (see _info)
+    _supported = importlib.util.find_spec('pyexifinfo') is not None
+
+    # metadata fetched ahead of time by prefetch_all(), keyed by path
+    _prefetched = {}
+    def prefetch_all(paths):
+        # pyexifinfo starts one exiftool process per file - instead, run exiftool once for all files
+        # (same arguments as pyexifinfo.information(); falls back to per-file calls on failure)
+        if not paths:
+            return
+        import subprocess
+        # pyexifinfo passes absolute paths (which exiftool reports back as SourceFile)
+        paths_by_abspath = {os.path.abspath(path): path for path in paths}
+        try:
+            result = subprocess.run(['exiftool', '-G', '-j', '-sort', '--', *paths_by_abspath],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            results = json.loads(result.stdout or b'[]')
+        except (OSError, ValueError):
+            return
+        for info in results:
+            path = paths_by_abspath.get(info.get('SourceFile'))
+            if path is not None:
+                ImageInfo_pyexifinfo._prefetched[path] = info
 
     def __init__(self, path):
         self.path = path
-        self._cached = None
+        self._cached = ImageInfo_pyexifinfo._prefetched.get(path)
 
     def __enter__(self):
         return self
@@ -248,9 +415,6 @@ class ImageInfo_pyexifinfo(ImageInfo_exiftool):
             self._cached = pyexifinfo.information(self.path) or False
         return self._cached
 
-    def _get_tag(self, key):
-        return self._info().get(key)
-
 # dummy class to capture error information
 class ImageInfo_unsupported:
     def __init__(self, path, parsers):
@@ -258,7 +422,7 @@ class ImageInfo_unsupported:
         self.parsers = parsers
 
     def msg(self):
-        return 'No supported parser is installed (%s) for file (%s)' %(self.parsers, path)
+        return 'No supported parser is installed (%s) for file (%s)' %(self.parsers, self.path)
 
     def throw(self):
         raise NotImplementedError(self.msg())
@@ -269,34 +433,40 @@ class ImageInfo_unsupported:
     def __exit__(self, *_):
         self.throw()
 
-def ImageInfo(path, require_write=False):
-    def get_supported_parsers(path, require_write):
-        #
-        # command-line
-        #
-        if require_write or os.environ.get('USE_PILLOW') == '0':
-            parsers = [ImageInfo_pyexiftool, ImageInfo_pyexifinfo]
-        elif os.environ.get('USE_PILLOW') == '1':
-            parsers = [ImageInfo_pillow]
-        else:
-            parsers = [ImageInfo_pillow, ImageInfo_pyexiftool, ImageInfo_pyexifinfo]
-        #
-        # file formats
-        #
-        _, dot_ext = os.path.splitext(path)
-        # TODO: extend using a filetype library (see https://stackoverflow.com/questions/10937350/how-to-check-type-of-files-without-extensions), e.g. filetype, magic
-        # TODO: other formats? also consider coding capabilities into file parser classes instead (too difficult?)
-        if dot_ext.lower() == '.heic':
-            parsers = [p for p in parsers if p != ImageInfo_pillow]
-
-        return parsers
-
-    parsers = get_supported_parsers(path, require_write)
-    for cImageInfo in parsers:
+def get_supported_parsers(path, require_write=False):
+    #
+    # command-line
+    #
+    if require_write or os.environ.get('USE_PILLOW') == '0':
+        parsers = [ImageInfo_pyexiftool, ImageInfo_pyexifinfo]
+    elif os.environ.get('USE_PILLOW') == '1':
+        parsers = [ImageInfo_pillow]
+    else:
+        parsers = [ImageInfo_pillow, ImageInfo_pyexiftool, ImageInfo_pyexifinfo]
+    #
+    # file formats
+    #
+    _, dot_ext = os.path.splitext(path)
+    # TODO: extend using a filetype library (see https://stackoverflow.com/questions/10937350/how-to-check-type-of-files-without-extensions), e.g. filetype, magic
+    # TODO: other formats? also consider coding capabilities into file parser classes instead (too difficult?)
+    if dot_ext.lower() == '.heic':
+        parsers = [p for p in parsers if p != ImageInfo_pillow]
+
+    return parsers
+
+# returns: first installed parser class for the given file, or None
+def get_parser(path, require_write=False):
+    for cImageInfo in get_supported_parsers(path, require_write):
         if cImageInfo._supported:
-            #print(cImageInfo) # debug print
-            return cImageInfo(path)
-    return ImageInfo_unsupported(parsers, path)
+            return cImageInfo
+    return None
+
+def ImageInfo(path, require_write=False):
+    cImageInfo = get_parser(path, require_write)
+    if cImageInfo:
+        #print(cImageInfo) # debug print
+        return cImageInfo(path)
+    return ImageInfo_unsupported(path, get_supported_parsers(path, require_write))
 
 #
 # source device management
@@ -316,11 +486,23 @@ def load_device_names(path):
             name_map[(columns[0], columns[1])] = columns[2]
     return name_map
 
-def save_device_names(path, name_map):
+# new_key: if specified, only this entry (assumed to be new) is appended to the file, instead of rewriting the whole file
+def save_device_names(path, name_map, new_key=None):
     print('[Begin updating device name map]')
-    with open(path, mode='w') as file:
-        for (device_make, device_model), device_id in name_map.items():
-            file.write(device_make + ',' + device_model + ',' + device_id + '\n')
+    if new_key is not None and os.path.isfile(path):
+        # the file may have been edited by hand, without a trailing newline
+        with open(path, mode='rb') as file:
+            size = file.seek(0, os.SEEK_END)
+            if size: file.seek(size - 1)
+            ends_with_newline = not size or file.read(1) == b'\n'
+        device_make, device_model = new_key
+        with open(path, mode='a') as file:
+            if not ends_with_newline: file.write('\n')
+            file.write(device_make + ',' + device_model + ',' + name_map[new_key] + '\n')
+    else:
+        with open(path, mode='w') as file:
+            for (device_make, device_model), device_id in name_map.items():
+                file.write(device_make + ',' + device_model + ',' + device_id + '\n')
     print('[Successfully updated device name map]')
 
 # representing a historical timezone config
@@ -333,6 +515,7 @@ class DeviceTzCfgEntry(namedtuple('DeviceTzCfgEntry', DEVICE_TZINFO_FIELDS)):
 # csv format - rows:
 # device_id, tzname, start time, end time (both in UTC, specified in ISO format with dashes)
 # end is optional - if omitted, will assume to be start of next entry
+# lines starting with "#" are ignored
 # returns: map from device_id to list of (tz, start, end) tuples
 def load_device_tzinfo(path):
     # format: { device_id : [ ( tz, start, end ), ... ], ... }
@@ -340,18 +523,26 @@ def load_device_tzinfo(path):
     device_tzmap = {}
     if not path or not os.path.exists(path):
         return device_tzmap
+    # start times of each device_tzmap list, used to keep lists sorted as entries are inserted
+    # (rows are usually in chronological order already, in which case each insert is an append)
+    device_starts = {}
+    utc = get_timezone('UTC')
+    def parse_time(ds):
+        if not ds: return None
+        # yr, mon, day, hr, min (any trailing fields are ignored)
+        return datetime(*map(int, ds.split('-', 5)[:5]), tzinfo=utc)
     with open(path, mode='r') as file:
-        reader = CsvReader(file)
-        def parse_time(ds):
-            if not ds: return None
-            yr, mon, day, hr, min, *_ = [int(v) for v in ds.split('-')]
-            return datetime(yr, mon, day, hr, min, tzinfo=get_timezone('UTC'))
-        for device_id, tzname, start, end, *_ in reader:
+        # plain split is sufficient (fields are never quoted)
+        for line in file:
+            if not line.strip() or line[0] == '#': continue
+            device_id, tzname, start, end = line.rstrip('\r\n').split(',', 4)[:4]
             tz = get_timezone(tzname)
             tz_item = DeviceTzCfgEntry(tz, parse_time(start), parse_time(end))
-            device_tzmap.setdefault(device_id, []).append(tz_item)
+            starts = device_starts.setdefault(device_id, [])
+            index = bisect.bisect_right(starts, tz_item.start)
+            starts.insert(index, tz_item.start)
+            device_tzmap.setdefault(device_id, []).insert(index, tz_item)
     for device_id, tz_list in device_tzmap.items():
-        tz_list.sort(key=lambda tz_item: tz_item.start.timestamp())
         for index in range(1, len(tz_list)):
             prev = tz_list[index - 1]
             cur = tz_list[index]
@@ -369,13 +560,13 @@ def tz_interpret_localtime(tz, localtime):
     def verify_add(tz, is_dst):
         #nonlocal localtime
         #nonlocal results
-        t = tz.localize(localtime, is_dst=is_dst)
+        t = localize(tz, localtime, is_dst)
         results.append((t.tzinfo, is_dst, t))
-    try:
-        verify_add(tz, None)
-    except pytz.exceptions.AmbiguousTimeError:
+    if is_ambiguous_localtime(tz, localtime):
         verify_add(tz, False)
         verify_add(tz, True)
+    else:
+        verify_add(tz, None)
     return results
 
 # return: [ (tzinfo, is_dst, datetime) ]
@@ -386,23 +577,26 @@ def device_tzinfo_interpret_localtime(device_tzmap, device_id, localtime):
         #nonlocal localtime
         #nonlocal results
         (tz, start, end) = tz_info
-        t = tz.localize(localtime, is_dst=is_dst)
+        t = localize(tz, localtime, is_dst)
         if t >= start and (t < end if end else True):
             results.append((t.tzinfo, is_dst, t))
             return True
         return False
     for tz_info in device_tzmap.get(device_id, {}):
-        try:
-            verify_add(tz_info, None)
-        except pytz.exceptions.AmbiguousTimeError:
+        if is_ambiguous_localtime(tz_info.tz, localtime):
             verify_add(tz_info, False)
             verify_add(tz_info, True)
+        else:
+            verify_add(tz_info, None)
     return results
 
 #
 # filename processing
 #
 
+# start of mainname (see below), used to strip any user-added prefix
+MAINNAME_PREFIX_CHECK = re.compile('DSC|IMG|dsc|dSC')
+
 # format:
 # * mainname == (DSC|IMG|dsc|dSC)[_][<modified_flag>]<serial>[<modified_flag>]
 # * followed by modifier suffix: [_<modifier>]
@@ -422,22 +616,20 @@ class SerialImageNameInfo(
         return "raw"
 
     def from_parse(regex, possible_modifier_override=False):
-        possible_modifier = possible_modifier_override
-        if (regex.group('modified_flag_pre') or
-            regex.group('modified_flag_post')):
-            possible_modifier = True
+        groups = regex.groupdict()
         return SerialImageNameInfo(
-            prefix=regex.group('mainname_prefix'),
-            serial=regex.group('serial'),
-            modified=possible_modifier
+            prefix=groups['mainname_prefix'],
+            serial=groups['serial'],
+            modified=(possible_modifier_override
+                or bool(groups['modified_flag_pre'] or groups['modified_flag_post'])),
         )
 
 # "new" format, generated by this tool
 # format:
-# * mainname == DSC<timestamp>['<precision>][_<device_id>]
+# * mainname == DSC<timestamp>['<precision>][_<device_id>] (timestamp: exactly 10 digits)
 # * followed by modifier suffix: [_<modifier>]
 # TODO: in newstyle filename, what if device is omitted?? modifier?? - currently distinguished by always having model name be uppercase and modifier be lowercase, but this is ambiguous on Windows and NTFS
-STRUCTURED_IMGNAME_CHECK = re.compile('DSC(?P<timestamp>[0-9]{10})(_(?P<device_id>[A-Z][A-Z0-9]*))?(_(?P<modifier>[a-z0-9\(\)\[\],-]+))?')
+STRUCTURED_IMGNAME_CHECK = re.compile('DSC(?P<timestamp>[0-9]{10})(?![0-9])(_(?P<device_id>[A-Z][A-Z0-9]*))?(_(?P<modifier>[a-z0-9\(\)\[\],-]+))?')
 #StructuredImageNameInfo = namedtuple('StructuredImageNameInfo', 'timestamp', 'timestamp_precision', 'device_id')
 class StructuredImageNameInfo(
     namedtuple(
@@ -465,10 +657,11 @@ class StructuredImageNameInfo(
         modifier = name_parts[2] if len(name_parts) >= 3 else ''
     """
     def from_parse(regex):
+        groups = regex.groupdict()
         return StructuredImageNameInfo(
-            timestamp=int(regex.group('timestamp')),
-            timestamp_precision=None, #regex.group('precision'), # TODO: handle precision & comparison
-            device_id=regex.group('device_id'),
+            timestamp=int(groups['timestamp']),
+            timestamp_precision=None, #groups['precision'], # TODO: handle precision & comparison
+            device_id=groups['device_id'],
         )
 
 # TODO - consider incorporating prefix, modifier into FilenameInfo
@@ -481,35 +674,28 @@ class StructuredImageNameInfo(
 # * unknown - None
 def parse_filename(filename):
     # remove suffix, remove everything up to IMG/DSC
-    #title, ext = os.path.splitext(basename); ext = ext[1:]
-    title = '.'.join(basename.split('.')[:-1])
-    ext = basename.split('.')[-1]
-    mainname_prefix = None
+    title, ext = os.path.splitext(filename); ext = ext[1:]
     # TODO: also need to account for the fact that sometimes description is appended to the end
-    for MAINNAME_PREFIX in ['DSC', 'IMG', 'dsc', 'dSC']:
-        start_idx = basename.find(MAINNAME_PREFIX)
-        if start_idx == -1: continue
-        mainname_prefix = MAINNAME_PREFIX
-        prefix = title[:start_idx]
-        mainname = title[start_idx:]
-        break
-    else:
+    mainname_prefix_match = MAINNAME_PREFIX_CHECK.search(title)
+    if not mainname_prefix_match:
         # unknown format
         return None, title, None, ext
+    start_idx = mainname_prefix_match.start()
+    prefix = title[:start_idx]
+    mainname = title[start_idx:]
 
+    nameinfo, modifier = None, None
     structuredNameCheck = STRUCTURED_IMGNAME_CHECK.search(mainname)
-    serialNameCheck = SERIAL_IMGNAME_CHECK.search(mainname)
+    serialNameCheck = SERIAL_IMGNAME_CHECK.search(mainname)\
+        if structuredNameCheck is None else None
     if structuredNameCheck:
         nameinfo = StructuredImageNameInfo.from_parse(structuredNameCheck)
         modifier = structuredNameCheck.group('modifier')
     elif serialNameCheck:
-        possible_modifier = False
-        if ext == 'jpg':
-            possible_modifier = True # historical reasons
+        possible_modifier = (ext == 'jpg') # historical reasons
         nameinfo = SerialImageNameInfo.from_parse(serialNameCheck, possible_modifier)
-        modifier = serialNameCheck.group('modifier')
-        if possible_modifier and not modifier:
-            modifier = True
+        # True: possibly modified, but no modifier specified
+        modifier = serialNameCheck.group('modifier') or possible_modifier
 
     return prefix, nameinfo, modifier, ext
 
@@ -519,15 +705,14 @@ def parse_filename(filename):
 
 def print_parse_filename(filename, *, disp_tz=None):
     prefix, nameinfo, modifier, ext = parse_filename(filename)
-    print("\tFilename:Format: %s" %nameinfo.formatDescription())
+    print(f"\tFilename:Format: {nameinfo.formatDescription()}")
     if isinstance(nameinfo, StructuredImageNameInfo):
         if modifier:
-            print('\t\t(Detected "%s" suffix in new-style name)' %modifier)
-        dt = datetime.fromtimestamp(nameinfo.timestamp, get_timezone('UTC'))
-        print("\t\tFilename:Timestamp|UTC: %s" %(dt.strftime(EXIF_TIMESTAMP_FORMAT)))
+            print(f'\t\t(Detected "{modifier}" suffix in new-style name)')
+        dt = datetime.fromtimestamp(nameinfo.timestamp, _UTC)
+        print(f"\t\tFilename:Timestamp|UTC: {dt:{EXIF_TIMESTAMP_FORMAT}}")
         if (disp_tz
-            and disp_tz != get_timezone('UTC')
-            and disp_tz != timezone.utc # just in case we used the native tzinfo object for utc (which does not compare equal to the pytz object, at least historically)
+            and disp_tz is not _UTC # get_timezone() returns this same instance for all UTC aliases
         ):
             #print_timestamp_explicit(dt, disp_tz, is_dst,
             print_timestamp_in(dt, disp_tz,
@@ -537,7 +722,7 @@ def print_parse_filename(filename, *, disp_tz=None):
             if ext == 'jpg':
                 print('\t\t(Detected lower case file extension)')
             elif not modifier is True:
-                print('\t\t(Detected "%s" suffix in old-style name)' %modifier)
+                print(f'\t\t(Detected "{modifier}" suffix in old-style name)')
         dt = None
         pass
     else:
@@ -547,7 +732,7 @@ def print_parse_filename(filename, *, disp_tz=None):
 
 def get_print_exif_value(imginfo, key):
     value = imginfo.get_exif_value(key)
-    print('\t' + key + ': ' + str(value))
+    print(f'\t{key}: {value}')
     return value
 
 def get_print_file_origin_timestamp(imginfo):
@@ -572,18 +757,19 @@ def get_set_device_id_interactive(imginfo, *, interactive, cfgfile_device_names,
             device_id = device_names.get(('', model_str))
         if not device_id:
             if not interactive:
-                print('\tNo abbreviation set for device model (%s)' %model_str)
+                print(f'\tNo abbreviation set for device model ({model_str})')
                 return False
             while True:
                 device_id = input_prefill('\t-> Enter an abbreviation for this device model (%s):\n' %model_str)
                 if device_id:
-                    device_names[(make_str or '', model_str)] = device_id
-                    save_device_names(cfgfile_device_names, device_names)
+                    device_key = (make_str or '', model_str)
+                    device_names[device_key] = device_id
+                    save_device_names(cfgfile_device_names, device_names, device_key)
                     break
                 else:
                     print('\tValue cannot be empty.')
         else:
-            print('\t<ModelAbbr>: %s' %device_id)
+            print(f'\t<ModelAbbr>: {device_id}')
     else:
         device_id = None
     return device_id
@@ -592,17 +778,20 @@ def get_set_device_id_interactive(imginfo, *, interactive, cfgfile_device_names,
 # TODO: new PIL IFD iteration problem
 def print_exif(imginfo):
     # TO DO: print parser info first
+    is_pil = isinstance(imginfo, ImageInfo_pillow)
+    if is_pil:
+        PIL_TAGS = ImageInfo_pillow.PIL.ExifTags.TAGS
+        PIL_GPSTAGS = ImageInfo_pillow.PIL.ExifTags.GPSTAGS
     for key, val in imginfo._info().items():
-        if isinstance(imginfo, ImageInfo_pillow): # PIL
-            import PIL
-            if key == ImageInfo_pillow.PIL_EXIF_TAGNAME_MAP['MakerNote']:
+        if is_pil: # PIL
+            if key == ImageInfo_pillow.PIL_EXIF_TAG_MAKERNOTE:
                 # reason: not parsed by old versions of PIL, instead dumped as raw
                 print('\tMakerNote (not supported)')
                 continue
-            if key in PIL.ExifTags.TAGS:
-                print(f"\t{PIL.ExifTags.TAGS[key]}: {repr(val)}")
-            elif key in PIL.ExifTags.GPSTAGS:
-                print(f"\t{PIL.ExifTags.GPSTAGS[key]}: {repr(val)}")
+            if key in PIL_TAGS:
+                print(f"\t{PIL_TAGS[key]}: {repr(val)}")
+            elif key in PIL_GPSTAGS:
+                print(f"\t{PIL_GPSTAGS[key]}: {repr(val)}")
         else: # exiftool
             print(f"\t{key}: {str(val)}")
 
@@ -614,20 +803,19 @@ def interpret_localtime_interactive(
     print_all, require_unique, cand_callback,
 ):
     def print_tz_candidates(tz_candidates, cand_callback, *, heading, indent_level=1):
-        indent = '\t' * indent_level
         if tz_candidates is None:
             return
         if len(tz_candidates) > 1:
-            print('\t' * indent_level + heading + ': (ambiguous)')
+            print(_INDENT[indent_level] + heading + ': (ambiguous)')
             indent_level += 1
         for (device_tz, is_dst, dt) in tz_candidates:
-            is_dst_str = '' if is_dst is None else ' (DST=%s)' %is_dst
-            zone_expr = device_tz.zone + is_dst_str
+            is_dst_str = '' if is_dst is None else f' (DST={is_dst})'
+            zone_expr = get_timezone_name(device_tz) + is_dst_str
             zone_name = device_tz.tzname(dt)
-            print('\t' * indent_level
+            print(_INDENT[indent_level]
                 + ((heading + ': ') if len(tz_candidates) == 1 else '')
                 # print full name + abbreviated name
-                + ('%s (%s)' %(zone_expr, zone_name) if zone_name
+                + (f'{zone_expr} ({zone_name})' if zone_name
                     else zone_expr
                 )
             )
@@ -648,11 +836,8 @@ def interpret_localtime_interactive(
         if print_all:
             print_tz_candidates(cfgfile_tz_candidates, cand_callback,
                 heading='LocaltimeInterpretation:Timezone (config file)')
-        if not functools.reduce(
-            lambda acc, x: (acc or x[0] == override_tz),
-            cfgfile_tz_candidates,
-            False,
-        ): # if override_tz is not found in cfgfile_tz_candidates
+        if not any(tz == override_tz for (tz, _, _) in cfgfile_tz_candidates):
+            # override_tz is not found in cfgfile_tz_candidates
             print('\t\t(Warning: specified timezone conflicts with device configuration)')
 
     if not tz_candidates: # implies not override_tz
@@ -674,19 +859,20 @@ def interpret_localtime_interactive(
                     return None
                 ord = int(answer) if answer.isdigit() else -1
                 if ord < 1 or ord > len(tz_candidates):
-                    print('\t\t(Error: invalid index - Please enter a number between 1 and %s)' %len(tz_candidates))
+                    print(f'\t\t(Error: invalid index - Please enter a number between 1 and {len(tz_candidates)})')
                     continue
                 result = tz_candidates[ord - 1]
                 if interactive > 1:
-                    print('\t\t(Selected: %s)' %result[0].zone)
+                    print(f'\t\t(Selected: {get_timezone_name(result[0])})')
                 return result
         elif require_unique:
             return False
         else:
             return None
 
-def interactive_file_rename(suggested_name, outdirname, *, interactive):
+def interactive_file_rename(path, suggested_name, outdirname, *, interactive):
     import shutil
+    basename = os.path.basename(path)
     first_prompt = True
     while True:
         if interactive > (1 if first_prompt else 0):
@@ -704,28 +890,266 @@ def interactive_file_rename(suggested_name, outdirname, *, interactive):
             print("\t\tFile already has the desired name")
             break
 
-        if (os.path.exists(dstpath)):
+        # reserve the destination name (fails atomically if it already exists), then move the file over it
+        try:
+            os.close(os.open(dstpath, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
             print("\t\tError: destination already exists")
             if not interactive:
                 return False
             continue
 
         try:
-            shutil.move(path, dstpath)
+            try:
+                # single rename syscall when source and destination are on the same filesystem
+                os.replace(path, dstpath)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(path, dstpath)
         except shutil.Error as e:
+            os.remove(dstpath)
             print(str(e))
             if not interactive:
                 return False
             continue
+        except:
+            os.remove(dstpath)
+            raise
         break
     return True
 
+#
+# file processing
+#
+
+class FileStatus(Enum):
+    OK = 'ok'
+    ERROR = 'error'
+    SKIPPED = 'skipped'
+
+# reads file metadata ahead of process_file(), without printing anything (can be run in parallel with file processing)
+# (path isn't checked for existence here - process_file() does that, and reports nonexistent files)
+# returns: ImageInfo instance
+def preload_image_info(path):
+    imginfo = ImageInfo(path)
+    if isinstance(imginfo, ImageInfo_unsupported):
+        return imginfo
+    try:
+        imginfo.preload()
+    except Exception:
+        pass # any error will be raised again (and reported) when the file is processed
+    return imginfo
+
+# imginfo: result of preload_image_info(path), if available
+# returns: FileStatus
+def process_file(path, *,
+    interactive, dry_run, do_show_all, do_check, do_rename, outdir,
+    cfgfile_device_names, device_names, device_tzmap, src_tz, disp_tz,
+    imginfo=None,
+):
+    basename = os.path.basename(path)
+    dirname = os.path.dirname(path) or "."
+    print(f"File {basename} ({dirname}):")
+    # checked even if metadata was preloaded, as the file may have been moved since (e.g. by an earlier rename of a duplicate path)
+    if not os.path.isfile(path):
+        print("\t(Error: Nonexistent file)")
+        return FileStatus.ERROR
+
+    #
+    # get file information
+    #
+    imginfo = imginfo or ImageInfo(path)
+    if isinstance(imginfo, ImageInfo_unsupported):
+        print('\t' + imginfo.msg())
+        return FileStatus.SKIPPED
+
+    prefix, nameinfo, modifier, ext, name_dt = print_parse_filename(basename, disp_tz=disp_tz)
+
+    with imginfo:
+        print(f"\tDimensions: {imginfo.dimensions()}")
+        # TODO (later): also print file format, color & pixel format?
+
+        if do_show_all:
+            print_exif(imginfo)
+
+        device_id = get_set_device_id_interactive(
+            imginfo,
+            cfgfile_device_names=cfgfile_device_names,
+            interactive=interactive,
+            device_names=device_names,
+        )
+        localtime, subsec_str = get_print_file_origin_timestamp(imginfo)
+        if not localtime:
+            print('\t(Skipping file due to missing metadata)')
+            return FileStatus.SKIPPED
+
+    #
+    # timezone processing
+    #
+    if name_dt:
+        print(f'\tLocalTimeInterpretation:FilenameTimeOffset: {name_dt.replace(tzinfo=None) - localtime}')
+
+    def tz_cand_callback(device_tz, is_dst, dt, *, indent_level):
+        #nonlocal name_dt
+        #nonlocal disp_tz
+        if disp_tz:
+            print_timestamp_in(dt, disp_tz,
+                heading='DateTimeOriginal|DISP: ', indent_level=indent_level+1)
+        if name_dt:
+            print_timestamp_in(name_dt, device_tz,
+                heading='Filename:Timestamp|PRESET: ', indent_level=indent_level+1)
+    tz_candidate = interpret_localtime_interactive(
+        localtime,
+        interactive=interactive,
+        device_tzmap=device_tzmap,
+        override_tz=src_tz,
+        device_id=device_id,
+        print_all=do_check,
+        require_unique=(do_check or do_rename),
+        cand_callback=tz_cand_callback,
+    )
+    if tz_candidate is None:
+        print('\t(Skipping file)')
+        return FileStatus.SKIPPED
+    elif tz_candidate is False:
+        print('\t(Error: unable to determine timezone - cannot proceed)')
+        return FileStatus.ERROR
+    else:
+        _, _, dt = tz_candidate
+    # seconds under UTC (computed once, as this involves a timezone offset lookup)
+    utc_ts = dt.timestamp()
+
+    name_exif_mismatch = False
+    if name_dt and (utc_ts != name_dt.timestamp()):
+        # TODO: ignore dropped precision?
+        # TODO: if diverging by >= 30 minutes. mark as possible timezone error; otherwise treat as minor offset warning?
+        print('\t(Warning: timestamp discrepancy detected between filename and EXIF in the specified timezone)')
+        name_exif_mismatch = True
+
+    #
+    # main actions
+    #
+    error = False
+
+    if do_check:
+        if not name_dt:
+            print("\t(File skipped)")
+            return FileStatus.SKIPPED
+        if name_exif_mismatch:
+            print('\t(Check failed.)')
+            return FileStatus.ERROR
+
+    # TODO: prefix isn't currently included (ambiguity vs. modifier)
+    if do_rename:
+        if device_id is False and do_rename: # TODO: remove after updating modifier format
+            print('\t(Skipping file due to missing configuration)')
+            return FileStatus.SKIPPED
+        if modifier is True and interactive:
+            modifier = input_prefill('\t-> Modification detected, please enter a modifier abbreviation (clear to remove): ', '')
+        elif modifier and interactive > 1:
+            modifier = input_prefill('\t-> Modifier detected, please confirm (clear to remove): ', modifier)
+        modifier_suffix = '_' + modifier if modifier else ''
+        subsec_part = ('.' + subsec_str) if subsec_str else ''
+        device_part = ('_' + device_id) if device_id else ''
+        suggested_name = f'DSC{int(utc_ts):010d}{subsec_part}{device_part}{modifier_suffix}.{ext}'
+        print(f'\tSuggested name: {suggested_name}')
+
+        if dry_run:
+            return FileStatus.OK
+
+        outdirname = outdir or dirname
+        error = not interactive_file_rename(path, suggested_name, outdirname, interactive=interactive)
+
+    #elif do_retag:
+
+    return FileStatus.ERROR if error else FileStatus.OK
+
+# number of upcoming files whose metadata is read in the background by process_files_serial()
+_PRELOAD_LOOKAHEAD = 8
+
+# files are processed in order on the main thread (prompts, renames), while metadata for the next few files is read in the background
+# (the lookahead is bounded, so that an interrupted run neither waits for nor holds metadata of the whole batch)
+# returns: [ FileStatus ] (one per path)
+def process_files_serial(paths, process_kwargs):
+    statuses = []
+    executor = ThreadPoolExecutor(max_workers=_PRELOAD_LOOKAHEAD)
+    try:
+        futures = deque(executor.submit(preload_image_info, path) for path in paths[:_PRELOAD_LOOKAHEAD])
+        for index, path in enumerate(paths):
+            imginfo = futures.popleft().result()
+            if index + _PRELOAD_LOOKAHEAD < len(paths):
+                futures.append(executor.submit(preload_image_info, paths[index + _PRELOAD_LOOKAHEAD]))
+            statuses.append(process_file(path, **process_kwargs, imginfo=imginfo))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return statuses
+
+# state of worker processes used by process_files_parallel()
+_worker_kwargs = None
+
+# prefetched: prefetched metadata of the parent process, for start methods where workers don't inherit it (see process_files_parallel)
+def _process_file_worker_init(process_kwargs, prefetched=None):
+    global _worker_kwargs
+    ImageInfo_pyexiftool._tool_detach()
+    if prefetched is not None:
+        (ImageInfo_pyexiftool._prefetched, ImageInfo_pyexiftool._prefetched_full,
+            ImageInfo_pyexifinfo._prefetched) = prefetched
+    _worker_kwargs = process_kwargs
+
+# carries the formatted traceback of an exception raised in a worker process (see process_files_parallel)
+class _WorkerTraceback(Exception):
+    def __str__(self):
+        return self.args[0]
+
+# returns: FileStatus (None on error), printed output, exception raised (or None), formatted traceback of exception
+# (the exception is returned rather than raised, so that the output printed before it isn't lost)
+def _process_file_worker(path):
+    status, error, error_tb = None, None, None
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            status = process_file(path, **_worker_kwargs)
+        except Exception as e:
+            error, error_tb = e, traceback.format_exc()
+    return status, output.getvalue(), error, error_tb
+
+# non-interactive & read-only operations only: files are processed independently, output is printed in order
+# returns: [ FileStatus ] (same order as paths)
+def process_files_parallel(paths, process_kwargs):
+    # imported here as multiprocessing is comparatively slow to import, and is not needed on the serial path
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # the platform's default start method is used: forked workers inherit prefetched metadata,
+    # otherwise (spawn/forkserver) workers re-import this module, and prefetched metadata is passed to each worker instead
+    mp_context = multiprocessing.get_context()
+    prefetched = None if mp_context.get_start_method() == 'fork' else (
+        ImageInfo_pyexiftool._prefetched, ImageInfo_pyexiftool._prefetched_full,
+        ImageInfo_pyexifinfo._prefetched)
+    statuses = []
+    with ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=mp_context,
+        initializer=_process_file_worker_init,
+        initargs=(process_kwargs, prefetched),
+    ) as executor:
+        for status, output, error, error_tb in executor.map(_process_file_worker, paths, chunksize=8):
+            print(output, end='')
+            if error is not None:
+                raise error from _WorkerTraceback(error_tb)
+            statuses.append(status)
+    return statuses
+
 #
 # command-line parsing & environment setup
 #
 
 #def main():
 if __name__ == "__main__":
+    # (printed here rather than at import, since worker processes may re-import this module)
+    for cImageInfo in (ImageInfo_pillow, ImageInfo_pyexiftool, ImageInfo_pyexifinfo):
+        if cImageInfo._supported:
+            print('[Installed: %s]' %cImageInfo._name)
+
     parser = argparse.ArgumentParser(
         description=_DESCRIPTION,
         epilog='Supported timezone strings:\n(1) tzdb format (e.g. "Pacific/Pitcairn")\n(2) "UTC" suffixed with ISO-8601 offset (e.g. "UTC+0800")\n(3) "UTC"',
@@ -816,7 +1240,15 @@ if __name__ == "__main__":
     # parse args, shared setup
     #
 
-    args = parser.parse_args()
+    # argparse takes quadratic time in the number of arguments (before python 3.13), which is noticeable for long path lists
+    # only the first path after "--" is passed through (so usage errors are reported as before), the rest are appended afterwards
+    argv = sys.argv[1:]
+    trailing_paths = []
+    if '--' in argv:
+        index = argv.index('--')
+        argv, trailing_paths = argv[:index + 2], argv[index + 2:]
+    args = parser.parse_args(argv)
+    args.paths += trailing_paths
 
     dry_run = args.dry_run or bool(os.environ.get('DRY_RUN') or 0) # off by default
     if args.verbose: print("[Dry run: %s]" %dry_run)
@@ -870,155 +1302,53 @@ if __name__ == "__main__":
     # process files
     #
 
-    print("")
-    good_paths = []
-    error_paths = []
-    skipped_paths = []
-
+    # exiftool-based files are read in one batch up front, rather than one exiftool call per file
+    # (file existence is only checked later, by process_file(), so that each path is stat'ed once)
+    paths_by_parser = {}
     for path in paths:
-        basename = os.path.basename(path)
-        dirname = os.path.dirname(path) or "."
-        print("File %s (%s):" %(basename, dirname))
-        if not os.path.isfile(path):
-            print("\t(Error: Nonexistent file)")
-            error_paths.append(path)
-            continue
-
-        #
-        # get file information
-        #
-        imginfo = ImageInfo(path)
-        if isinstance(imginfo, ImageInfo_unsupported):
-            print('\t' + imginfo.msg())
-            skipped_paths.append(path)
-            continue
-
-        prefix, nameinfo, modifier, ext, name_dt = print_parse_filename(basename, disp_tz=disp_tz)
-
-        with imginfo:
-            print("\tDimensions: %s" %str(imginfo.dimensions()))
-            # TODO (later): also print file format, color & pixel format?
-
-            if do_show_all:
-                print_exif(imginfo)
-
-            device_id = get_set_device_id_interactive(
-                imginfo,
-                cfgfile_device_names=cfgfile_device_names,
-                interactive=interactive,
-                device_names=device_names,
-            )
-            localtime, subsec_str = get_print_file_origin_timestamp(imginfo)
-            if not localtime:
-                print('\t(Skipping file due to missing metadata)')
-                skipped_paths.append(path)
-                continue
-
-        #
-        # timezone processing
-        #
-        if name_dt:
-            print('\tLocalTimeInterpretation:FilenameTimeOffset: %s' %(
-                (name_dt.replace(tzinfo=None) - localtime)
-            ))
-
-        def tz_cand_callback(device_tz, is_dst, dt, *, indent_level):
-            #nonlocal name_dt
-            #nonlocal disp_tz
-            if disp_tz:
-                print_timestamp_in(dt, disp_tz,
-                    heading='DateTimeOriginal|DISP: ', indent_level=indent_level+1)
-            if name_dt:
-                print_timestamp_in(name_dt, device_tz,
-                    heading='Filename:Timestamp|PRESET: ', indent_level=indent_level+1)
-        tz_candidate = interpret_localtime_interactive(
-            localtime,
-            interactive=interactive,
-            device_tzmap=device_tzmap,
-            override_tz=src_tz,
-            device_id=device_id,
-            print_all=do_check,
-            require_unique=(do_check or do_rename),
-            cand_callback=tz_cand_callback,
-        )
-        if tz_candidate is None:
-            print('\t(Skipping file)')
-            skipped_paths.append(path)
-            continue
-        elif tz_candidate is False:
-            print('\t(Error: unable to determine timezone - cannot proceed)')
-            error_paths.append(path)
-            continue
-        else:
-            _, _, dt = tz_candidate
-
-        name_exif_mismatch = False
-        if name_dt and (dt.timestamp() != name_dt.timestamp()):
-            # TODO: ignore dropped precision?
-            # TODO: if diverging by >= 30 minutes. mark as possible timezone error; otherwise treat as minor offset warning?
-            print('\t(Warning: timestamp discrepancy detected between filename and EXIF in the specified timezone)')
-            name_exif_mismatch = True
-
-        #
-        # main actions
-        #
-        error = False
-
-        if do_check:
-            if not name_dt:
-                print("\t(File skipped)")
-                skipped_paths.append(path)
-                continue
-            if name_exif_mismatch:
-                print('\t(Check failed.)')
-                error_paths.append(path)
-                continue
+        paths_by_parser.setdefault(get_parser(path), []).append(path)
+    ImageInfo_pyexiftool.prefetch_all(paths_by_parser.get(ImageInfo_pyexiftool), full=do_show_all)
+    ImageInfo_pyexifinfo.prefetch_all(paths_by_parser.get(ImageInfo_pyexifinfo))
 
-        # TODO: prefix isn't currently included (ambiguity vs. modifier)
-        if do_rename:
-            if device_id is False and do_rename: # TODO: remove after updating modifier format
-                print('\t(Skipping file due to missing configuration)')
-                skipped_paths.append(path)
-                continue
-            if modifier is True and interactive:
-                modifier = input_prefill('\t-> Modification detected, please enter a modifier abbreviation (clear to remove): ', '')
-            elif modifier and interactive > 1:
-                modifier = input_prefill('\t-> Modifier detected, please confirm (clear to remove): ', modifier)
-            modifier_suffix = '_' + modifier if modifier else ''
-            suggested_name = 'DSC%010i%s%s%s.%s' %(
-                int(dt.timestamp()), # seconds under UTC
-                ('.' + subsec_str) if subsec_str else '',
-                ('_' + device_id) if device_id else '',
-                modifier_suffix,
-                ext
-            )
-            print('\tSuggested name: %s' %suggested_name)
-
-            if dry_run:
-                good_paths.append(path)
-                continue
-
-            outdirname = outdir or dirname
-            error = not interactive_file_rename(suggested_name, outdirname, interactive=interactive)
+    print("")
 
-        #elif do_retag:
+    process_kwargs = dict(
+        interactive=interactive,
+        dry_run=dry_run,
+        do_show_all=do_show_all,
+        do_check=do_check,
+        do_rename=do_rename,
+        outdir=outdir,
+        cfgfile_device_names=cfgfile_device_names,
+        device_names=device_names,
+        device_tzmap=device_tzmap,
+        src_tz=src_tz,
+        disp_tz=disp_tz,
+    )
+    if interactive == 0 and not do_rename and (do_show_all or do_check) and len(paths) > 1:
+        statuses = process_files_parallel(paths, process_kwargs)
+    else:
+        statuses = process_files_serial(paths, process_kwargs)
 
-        (error_paths if error else good_paths).append(path)
+    results = list(zip(paths, statuses))
+    error_paths = [path for path, status in results if status is FileStatus.ERROR]
+    good_paths = [path for path, status in results if status is FileStatus.OK]
+    skipped_paths = [path for path, status in results if status is FileStatus.SKIPPED]
 
     print("")
 
     if len(error_paths):
         print("Errors:")
         for path in error_paths:
-            print("\t%s" %path)
+            print(f"\t{path}")
 
     if ((do_check or do_rename)# or do_retag)
         and len(good_paths)):
         print("Successfully processed:")
         for path in good_paths:
-            print("\t%s" %path)
+            print(f"\t{path}")
 
     if len(skipped_paths):
         print("Skipped:")
         for path in skipped_paths:
-            print("\t%s" %path)
+            print(f"\t{path}")